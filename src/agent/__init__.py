@@ -2,11 +2,14 @@
 
 __all__ = [
     "config",
+    "jsonl",
     "ingest",
     "index",
     "retrieve",
+    "query_cache",
     "generate",
     "seo_rules",
+    "server",
     "validate",
     "cli",
 ]
@@ -5,16 +5,18 @@ from __future__ import annotations
 import argparse
 import json
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, List
 
 from .config import AgentConfig
-#from .generate import draft_response, generate_article
 from .ingest import ingest_knowledge_base
-from .index import DEFAULT_MODEL, build_index
-from .retrieve import RetrievedChunk, retrieve_chunks
 from .seo_rules import apply_seo_rules
 from .validate import check_compliance, validate_or_raise
 
+# faiss, numpy and sentence-transformers take hundreds of milliseconds to import,
+# so modules that pull them in are imported inside the commands that need them.
+if TYPE_CHECKING:
+    from .retrieve import RetrievedChunk
+
 
 def build_parser() -> argparse.ArgumentParser:
     """Create the CLI argument parser."""
@@ -85,6 +87,22 @@ def build_parser() -> argparse.ArgumentParser:
         help="Destination file for the generated Markdown article",
     )
 
+    serve_parser = subparsers.add_parser(
+        "serve", help="Keep an embedding model loaded and serve query embeddings over a Unix socket"
+    )
+    serve_parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Socket path (defaults to $AGENT_EMBED_SOCKET or $XDG_RUNTIME_DIR/agent.sock)",
+    )
+    serve_parser.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        help="SentenceTransformer model to preload (defaults to all-MiniLM-L6-v2)",
+    )
+
     # Support legacy invocation without a subcommand.
     parser.add_argument("--config", type=Path, help=argparse.SUPPRESS)
     parser.add_argument("--query", type=str, help=argparse.SUPPRESS)
@@ -99,7 +117,18 @@ def run(args: argparse.Namespace) -> str:
         documents = ingest_knowledge_base(args.raw_dir, args.output)
         return f"Ingested {len(documents)} documents into {args.output}"
 
+    if args.command == "serve":
+        from .index import DEFAULT_MODEL
+        from .server import default_socket_path, serve
+
+        socket_path = args.socket or default_socket_path()
+        print(f"Serving embeddings on {socket_path}")
+        serve(socket_path=socket_path, model_name=args.model or DEFAULT_MODEL)
+        return "Embedding server stopped"
+
     if args.command == "index":
+        from .index import DEFAULT_MODEL, build_index
+
         index_path = build_index(
             kb_path=args.input,
             index_dir=args.output,
@@ -110,16 +139,17 @@ def run(args: argparse.Namespace) -> str:
         )
         return f"Built index at {index_path}"
 
+    from .generate import draft_response
+    from .index import refresh_index
+
     config_path = getattr(args, "config", None)
     config = AgentConfig.load(config_path)
     kb_path = config.knowledge_base_path
     index_dir = config.index_path
-    index_path = index_dir / "index.faiss"
-    if not index_path.exists():
-        build_index(kb_path=kb_path, index_dir=index_dir)
+    refresh_index(kb_path, index_dir)
 
     if args.command == "retrieve":
-        results = retrieve_chunks(index_dir=index_dir, query=args.query, top_k=args.topk)
+        results = _cached_retrieve(index_dir=index_dir, query=args.query, top_k=args.topk)
         return json.dumps([chunk.to_dict() for chunk in results], ensure_ascii=False, indent=2)
 
     topic: str | None = None
@@ -131,7 +161,7 @@ def run(args: argparse.Namespace) -> str:
     chunks: List[RetrievedChunk] = []
     response = "No query provided."
     if topic:
-        chunks = retrieve_chunks(index_dir=index_dir, query=topic, top_k=args.limit)
+        chunks = _cached_retrieve(index_dir=index_dir, query=topic, top_k=args.limit)
         response = draft_response(topic, chunks)
 
     if getattr(args, "apply_seo", False):
@@ -153,8 +183,32 @@ def run(args: argparse.Namespace) -> str:
     return response
 
 
+def _cached_retrieve(index_dir: Path, query: str, top_k: int) -> List[RetrievedChunk]:
+    """Retrieve chunks, serving near-duplicate recent queries from the semantic cache."""
+    from .query_cache import QueryCache
+    from .retrieve import embed_query, retrieve_chunks
+
+    query_embedding = embed_query(index_dir, query)
+    if query_embedding is None or top_k <= 0:
+        return retrieve_chunks(index_dir=index_dir, query=query, top_k=top_k)
+
+    cache = QueryCache.load(index_dir)
+    cached = cache.get(query_embedding, top_k)
+    if cached is not None:
+        # Hits are not written back; rewriting the whole cache would cost more than the lookup saved.
+        return cached
+
+    chunks = retrieve_chunks(index_dir=index_dir, query=query, top_k=top_k, query_embedding=query_embedding)
+    if chunks:
+        cache.put(query_embedding, top_k, chunks)
+        cache.save()
+    return chunks
+
+
 def _write_pipeline(topic: str, chunks: List[RetrievedChunk], keyword: str | None, output_path: Path) -> str:
     """Retrieve -> generate -> SEO rules -> validate -> save pipeline for articles."""
+    from .generate import generate_article
+
     article = generate_article(topic, chunks)
     article = apply_seo_rules(article, keyword=keyword)
     validate_or_raise(article)
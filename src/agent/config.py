@@ -1,6 +1,8 @@
 """Configuration loading and environment helpers for the agent."""
 
+import copy
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 import json
 import os
@@ -23,16 +25,18 @@ class AgentConfig:
     def load(cls, path: Path | None = None) -> "AgentConfig":
         """Load configuration from JSON if it exists, otherwise return defaults."""
         config_path = path or DEFAULT_CONFIG_PATH
-        if config_path.exists():
-            with config_path.open("r", encoding="utf-8") as f:
-                payload = json.load(f)
-            return cls(
-                knowledge_base_path=Path(payload.get("knowledge_base_path", cls.knowledge_base_path)),
-                index_path=Path(payload.get("index_path", cls.index_path)),
-                model_name=payload.get("model_name", cls.model_name),
-                extra=payload.get("extra", {}),
-            )
-        return cls()
+        try:
+            mtime_ns = config_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return cls()
+        payload = _read_config(str(config_path), mtime_ns)
+        return cls(
+            knowledge_base_path=Path(payload.get("knowledge_base_path", cls.knowledge_base_path)),
+            index_path=Path(payload.get("index_path", cls.index_path)),
+            model_name=payload.get("model_name", cls.model_name),
+            # Deep copy: the parsed payload is shared by every load of this file.
+            extra=copy.deepcopy(payload.get("extra", {})),
+        )
 
     def to_json(self) -> str:
         """Serialize configuration to JSON string."""
@@ -45,3 +49,10 @@ class AgentConfig:
             },
             indent=2,
         )
+
+
+@lru_cache(maxsize=8)
+def _read_config(path: str, mtime_ns: int) -> Dict[str, Any]:
+    """Parse a config file; keyed by mtime so edits on disk invalidate the cache."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import re
 from textwrap import dedent
 from typing import Iterable, List
 
 from .retrieve import RetrievedChunk
 
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
 STRICT_PROMPT_TEMPLATE = dedent(
     """
     You are a financial content writer producing a Markdown article about "{topic}".
@@ -41,7 +44,7 @@ def generate_article(topic: str, chunks: List[RetrievedChunk]) -> str:
     lines: List[str] = [f"# {topic}", "", "## Evidence-backed points"]
     for idx, chunk in enumerate(chunks, start=1):
         citation = f"[{chunk.doc_id} — {chunk.source_path}]"
-        snippet = " ".join(chunk.text.split())
+        snippet = _collapse_whitespace(chunk.text)
         lines.append(f"{idx}. {snippet} {citation}")
 
     lines.append("")
@@ -64,5 +67,9 @@ def draft_response(query: str, chunks: List[RetrievedChunk]) -> str:
 
 def _format_context_line(chunk: RetrievedChunk) -> str:
     citation = f"[{chunk.doc_id} — {chunk.source_path}]"
-    snippet = " ".join(chunk.text.split())
+    snippet = _collapse_whitespace(chunk.text)
     return f"- {citation} {snippet}"
+
+
+def _collapse_whitespace(text: str) -> str:
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
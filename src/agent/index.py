@@ -2,20 +2,45 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import sqlite3
+from contextlib import closing
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Sequence, Tuple
 
 import faiss  # type: ignore
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from .jsonl import dump_lines, iter_jsonl
+
 
 DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 DEFAULT_CHUNK_SIZE = 1000
 DEFAULT_CHUNK_OVERLAP = 200
 DEFAULT_BATCH_SIZE = 32
+EMBEDDING_CACHE_FILENAME = "emb_cache.db"
+EMBEDDINGS_FILENAME = "embeddings.f16"
+MANIFEST_FILENAME = "_manifest.json"
+_CACHE_LOOKUP_BATCH = 500
+# Texts handed to the model per encode call, as a multiple of the embedding batch size.
+_ENCODE_BLOCK_BATCHES = 16
+# Vectors converted back to float32 per FAISS add/train call.
+_FAISS_BLOCK_SIZE = 65536
+# Below this many vectors an exact flat scan stays cache-resident and beats graph search.
+HNSW_MIN_VECTORS = 2000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# Beyond this many vectors even SQ8 graphs get large; switch to IVF-PQ codes.
+IVFPQ_MIN_VECTORS = 100_000
+IVFPQ_NPROBE = 16
+IVFPQ_BITS = 8
+# Sub-quantizer counts tried in order; the first that divides the dimension wins.
+_IVFPQ_SUBQUANTIZERS = (64, 48, 32, 24, 16, 12, 8, 4, 2, 1)
 
 
 @dataclass
@@ -39,38 +64,142 @@ def build_index(
     chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
     batch_size: int = DEFAULT_BATCH_SIZE,
 ) -> Path:
-    """Load KB JSONL, chunk content, embed, and persist a FAISS index plus metadata."""
+    """Load KB JSONL, chunk content, embed, and persist a FAISS index plus metadata.
+
+    Records stream through parse -> chunk -> embed -> write one block at a time, so
+    peak memory is bounded by the block size rather than the corpus size.
+    """
     _validate_chunking(chunk_size, chunk_overlap)
-    documents = _load_kb(kb_path)
+    documents = _iter_kb(kb_path)
+    # Stat before reading chunks so a KB edited mid-build is seen as newer next time.
+    kb_mtime_ns = kb_path.stat().st_mtime_ns
     chunks = _chunk_documents(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    if not chunks:
-        raise ValueError(f"No text chunks produced from {kb_path}")
-
-    model = SentenceTransformer(model_name)
-    embeddings = _encode_chunks(model, [chunk.text for chunk in chunks], batch_size=batch_size)
-    faiss_index = _build_faiss_index(embeddings)
 
     index_dir.mkdir(parents=True, exist_ok=True)
     index_path = index_dir / "index.faiss"
     meta_path = index_dir / "meta.jsonl"
+    embeddings_path = index_dir / EMBEDDINGS_FILENAME
+    # Write everything under temporary names so a failed build never pairs a new
+    # meta.jsonl with the previous index.faiss, and readers that memory-map the
+    # old index keep a valid file until they reopen it.
+    index_tmp = index_path.with_name(index_path.name + ".tmp")
+    meta_tmp = meta_path.with_name(meta_path.name + ".tmp")
+    embeddings_tmp = embeddings_path.with_name(embeddings_path.name + ".tmp")
+
+    count = 0
+    dimension = 0
+    blocks = _batched(chunks, batch_size * _ENCODE_BLOCK_BATCHES)
+    with meta_tmp.open("wb") as meta_file, embeddings_tmp.open("wb") as vector_file:
+        embedded = _embed_blocks(model_name, blocks, batch_size, index_dir / EMBEDDING_CACHE_FILENAME)
+        for block, vectors in embedded:
+            # Unit-norm vectors lose no meaningful precision when stored as float16.
+            vector_file.write(vectors.astype("float16").tobytes())
+            _write_metadata(meta_file, block, first_position=count)
+            count += len(block)
+            dimension = vectors.shape[1]
+    if count == 0:
+        meta_tmp.unlink()
+        embeddings_tmp.unlink()
+        raise ValueError(f"No text chunks produced from {kb_path}")
 
-    faiss.write_index(faiss_index, str(index_path))
-    _write_metadata(meta_path, chunks, model_name)
+    embeddings = np.memmap(embeddings_tmp, dtype="float16", mode="r", shape=(count, dimension))
+    faiss_index, index_settings = _build_faiss_index(embeddings)
+    del embeddings
+
+    faiss.write_index(faiss_index, str(index_tmp))
+    manifest_path = index_dir / MANIFEST_FILENAME
+    manifest_tmp = manifest_path.with_name(manifest_path.name + ".tmp")
+    _write_manifest(
+        manifest_tmp,
+        {
+            "model_name": model_name,
+            "kb_path": str(kb_path.resolve()),
+            "kb_mtime_ns": kb_mtime_ns,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "batch_size": batch_size,
+            **index_settings,
+        },
+    )
+    # Every file is complete before any is swapped in, so the window in which a
+    # new index can pair with old settings is just these four renames.
+    index_tmp.replace(index_path)
+    meta_tmp.replace(meta_path)
+    embeddings_tmp.replace(embeddings_path)
+    manifest_tmp.replace(manifest_path)
 
     return index_path
 
 
-def _load_kb(kb_path: Path) -> List[dict]:
+def index_is_stale(kb_path: Path, index_dir: Path) -> bool:
+    """Return True when the index is missing or older than the knowledge base it was built from.
+
+    An index whose manifest records a different knowledge base (or none, for
+    indexes built before the path was recorded) is never considered stale, so
+    an index built by hand from another corpus is not overwritten.
+    """
+    index_path = index_dir / "index.faiss"
+    if not index_path.exists():
+        return True
     if not kb_path.exists():
-        raise FileNotFoundError(f"Knowledge base file not found at {kb_path}")
-    records: List[dict] = []
-    with kb_path.open("r", encoding="utf-8") as f:
-        for line in f:
+        return False
+    manifest = load_manifest(index_dir)
+    built_path = manifest.get("kb_path")
+    if built_path is None or Path(built_path) != kb_path.resolve():
+        return False
+    built_from = manifest.get("kb_mtime_ns")
+    if built_from is None:
+        return index_path.stat().st_mtime_ns < kb_path.stat().st_mtime_ns
+    return int(built_from) != kb_path.stat().st_mtime_ns
+
+
+def refresh_index(kb_path: Path, index_dir: Path) -> Path | None:
+    """Build a missing or stale index, reusing the model, chunking and batch size it was built with.
+
+    Returns the index path when a build ran, or None when the index was current.
+    """
+    if not index_is_stale(kb_path, index_dir):
+        return None
+    manifest = load_manifest(index_dir) if (index_dir / "index.faiss").exists() else {}
+    return build_index(
+        kb_path=kb_path,
+        index_dir=index_dir,
+        model_name=manifest.get("model_name") or DEFAULT_MODEL,
+        chunk_size=int(manifest.get("chunk_size") or DEFAULT_CHUNK_SIZE),
+        chunk_overlap=int(manifest.get("chunk_overlap", DEFAULT_CHUNK_OVERLAP)),
+        batch_size=int(manifest.get("batch_size") or DEFAULT_BATCH_SIZE),
+    )
+
+
+def load_manifest(index_dir: Path) -> dict:
+    """Return index-level settings such as the embedding model and index type.
+
+    Indexes built before the manifest existed stored these fields on every
+    metadata row, so the first row is used as a fallback, also when the
+    manifest cannot be parsed.
+    """
+    manifest_path = index_dir / MANIFEST_FILENAME
+    if manifest_path.exists():
+        with manifest_path.open("r", encoding="utf-8") as f:
             try:
-                records.append(json.loads(line))
+                return json.load(f)
             except json.JSONDecodeError:
-                continue
-    return records
+                pass
+    meta_path = index_dir / "meta.jsonl"
+    if meta_path.exists():
+        with meta_path.open("r", encoding="utf-8") as f:
+            first_line = f.readline()
+        try:
+            return json.loads(first_line)
+        except json.JSONDecodeError:
+            pass
+    return {}
+
+
+def _iter_kb(kb_path: Path) -> Iterator[dict]:
+    if not kb_path.exists():
+        raise FileNotFoundError(f"Knowledge base file not found at {kb_path}")
+    return iter_jsonl(kb_path)
 
 
 def _validate_chunking(chunk_size: int, chunk_overlap: int) -> None:
@@ -86,8 +215,8 @@ def _chunk_documents(
     documents: Iterable[dict],
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
-) -> List[IndexedChunk]:
-    chunks: List[IndexedChunk] = []
+) -> Iterator[IndexedChunk]:
+    position = 0
     for doc in documents:
         text = str(doc.get("text") or "").strip()
         if not text:
@@ -96,36 +225,99 @@ def _chunk_documents(
         title = str(doc.get("title") or "")
         source_path = str(doc.get("source_path") or "")
         for idx, (chunk_text, start, end) in enumerate(_chunk_text(text, chunk_size, chunk_overlap)):
-            chunk_id = f"{doc_id}-{idx}" if doc_id else f"chunk-{len(chunks)}"
-            chunks.append(
-                IndexedChunk(
-                    chunk_id=chunk_id,
-                    text=chunk_text,
-                    doc_id=doc_id,
-                    title=title,
-                    source_path=source_path,
-                    start=start,
-                    end=end,
-                )
+            chunk_id = f"{doc_id}-{idx}" if doc_id else f"chunk-{position}"
+            position += 1
+            yield IndexedChunk(
+                chunk_id=chunk_id,
+                text=chunk_text,
+                doc_id=doc_id,
+                title=title,
+                source_path=source_path,
+                start=start,
+                end=end,
             )
-    return chunks
 
 
 def _chunk_text(text: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[str, int, int]]:
-    segments: List[Tuple[str, int, int]] = []
-    start = 0
     length = len(text)
-    while start < length:
+    segments: List[Tuple[str, int, int]] = []
+    for start in _chunk_offsets(length, chunk_size, chunk_overlap):
         end = min(start + chunk_size, length)
-        segment = text[start:end]
-        segments.append((segment, start, end))
-        if end == length:
-            break
-        start = end - chunk_overlap
+        segments.append((text[start:end], start, end))
     return segments
 
 
-def _encode_chunks(model: SentenceTransformer, texts: Sequence[str], batch_size: int) -> np.ndarray:
+def _chunk_offsets(length: int, chunk_size: int, chunk_overlap: int) -> range:
+    """Return window start offsets; the last window is the first one reaching ``length``."""
+    if length <= 0:
+        return range(0)
+    step = chunk_size - chunk_overlap
+    windows = 1 + max(0, -(-(length - chunk_size) // step))
+    return range(0, windows * step, step)
+
+
+def _batched(chunks: Iterable[IndexedChunk], size: int) -> Iterator[List[IndexedChunk]]:
+    iterator = iter(chunks)
+    while block := list(islice(iterator, size)):
+        yield block
+
+
+def _embed_blocks(
+    model_name: str,
+    blocks: Iterable[List[IndexedChunk]],
+    batch_size: int,
+    cache_path: Path,
+) -> Iterator[Tuple[List[IndexedChunk], np.ndarray]]:
+    """Yield each block of chunks with its float32 embeddings.
+
+    Vectors are cached on disk keyed by a hash of the model name and chunk text, so
+    only new or edited chunks reach the model and switching models never returns
+    stale vectors.
+    """
+    model: SentenceTransformer | None = None
+    with closing(sqlite3.connect(str(cache_path))) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        for block in blocks:
+            keys = [_embedding_key(model_name, chunk.text) for chunk in block]
+            cached = _fetch_cached_vectors(conn, keys)
+            miss_idx = [idx for idx, key in enumerate(keys) if key not in cached]
+
+            fresh = np.empty((0, 0), dtype="float32")
+            if miss_idx:
+                # Repeated boilerplate and overlapping short documents yield identical
+                # chunk texts; encode each distinct text once.
+                unique_rows: Dict[str, int] = {}
+                unique_texts: List[str] = []
+                for idx in miss_idx:
+                    if keys[idx] not in unique_rows:
+                        unique_rows[keys[idx]] = len(unique_texts)
+                        unique_texts.append(block[idx].text)
+                # Only load the model when something actually needs encoding.
+                if model is None:
+                    model = SentenceTransformer(model_name)
+                unique_vectors = _encode_texts(model, unique_texts, batch_size=batch_size)
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        ((key, unique_vectors[row].tobytes()) for key, row in unique_rows.items()),
+                    )
+                fresh = unique_vectors[[unique_rows[keys[idx]] for idx in miss_idx]]
+
+            if miss_idx:
+                dimension = fresh.shape[1]
+            else:
+                dimension = np.frombuffer(next(iter(cached.values())), dtype="float32").shape[0]
+            vectors = np.empty((len(block), dimension), dtype="float32")
+            for idx, key in enumerate(keys):
+                vector = cached.get(key)
+                if vector is not None:
+                    vectors[idx] = np.frombuffer(vector, dtype="float32")
+            if miss_idx:
+                vectors[miss_idx] = fresh
+            yield block, vectors
+
+
+def _encode_texts(model: SentenceTransformer, texts: Sequence[str], batch_size: int) -> np.ndarray:
     vectors = model.encode(
         texts,
         batch_size=batch_size,
@@ -137,27 +329,81 @@ def _encode_chunks(model: SentenceTransformer, texts: Sequence[str], batch_size:
     return np.asarray(vectors, dtype="float32")
 
 
-def _build_faiss_index(embeddings: np.ndarray) -> faiss.Index:
+def _embedding_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _fetch_cached_vectors(conn: sqlite3.Connection, keys: Sequence[str]) -> Dict[str, bytes]:
+    cached: Dict[str, bytes] = {}
+    unique_keys = list(dict.fromkeys(keys))
+    for offset in range(0, len(unique_keys), _CACHE_LOOKUP_BATCH):
+        batch = unique_keys[offset : offset + _CACHE_LOOKUP_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+        cached.update(rows)
+    return cached
+
+
+def _build_faiss_index(embeddings: np.ndarray) -> Tuple[faiss.Index, Dict[str, object]]:
+    """Build an inner-product index sized to the corpus, plus the settings retrieval needs.
+
+    Embeddings are L2-normalized, so inner product is cosine similarity for both
+    the exact flat index and the HNSW graph used for larger corpora. The graph
+    stores vectors as trained 8-bit scalar codes, a quarter of the float32 size,
+    and very large corpora use IVF-PQ, which compresses each vector to a few dozen
+    bytes and only scans ``nprobe`` inverted lists per query.
+    """
     if embeddings.size == 0:
         raise ValueError("No embeddings to index.")
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dimension)
-    index.add(embeddings)
-    return index
-
-
-def _write_metadata(meta_path: Path, chunks: Iterable[IndexedChunk], model_name: str) -> None:
-    with meta_path.open("w", encoding="utf-8") as f:
-        for position, chunk in enumerate(chunks):
-            payload = {
-                "position": position,
-                "chunk_id": chunk.chunk_id,
-                "doc_id": chunk.doc_id,
-                "title": chunk.title,
-                "source_path": chunk.source_path,
-                "text": chunk.text,
-                "start": chunk.start,
-                "end": chunk.end,
-                "model_name": model_name,
-            }
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    count = embeddings.shape[0]
+    if count < HNSW_MIN_VECTORS:
+        index = faiss.IndexFlatIP(dimension)
+        settings: Dict[str, object] = {"index_type": "flat"}
+    elif count >= IVFPQ_MIN_VECTORS:
+        nlist = int(4 * count**0.5)
+        subquantizers = next(m for m in _IVFPQ_SUBQUANTIZERS if dimension % m == 0)
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, subquantizers, IVFPQ_BITS, faiss.METRIC_INNER_PRODUCT)
+        # k-means wants roughly 40 training points per list.
+        stride = max(1, count // max(_FAISS_BLOCK_SIZE, 40 * nlist))
+        index.train(_as_float32(embeddings[::stride]))
+        settings = {"index_type": "ivfpq", "nprobe": IVFPQ_NPROBE}
+    else:
+        # QT_8bit learns per-dimension ranges; QT_8bit_direct assumes [0, 255] inputs.
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        # Scalar-quantizer ranges only need an evenly spread sample, not every vector.
+        stride = max(1, embeddings.shape[0] // _FAISS_BLOCK_SIZE)
+        index.train(_as_float32(embeddings[::stride]))
+        settings = {"index_type": "hnsw_sq8", "ef_search": HNSW_EF_SEARCH}
+    for offset in range(0, embeddings.shape[0], _FAISS_BLOCK_SIZE):
+        index.add(_as_float32(embeddings[offset : offset + _FAISS_BLOCK_SIZE]))
+    return index, settings
+
+
+def _as_float32(vectors: np.ndarray) -> np.ndarray:
+    # FAISS only accepts C-contiguous float32 input.
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def _write_metadata(f: BinaryIO, chunks: Iterable[IndexedChunk], first_position: int) -> None:
+    payloads = (
+        {
+            "position": position,
+            "chunk_id": chunk.chunk_id,
+            "doc_id": chunk.doc_id,
+            "title": chunk.title,
+            "source_path": chunk.source_path,
+            "text": chunk.text,
+            "start": chunk.start,
+            "end": chunk.end,
+        }
+        for position, chunk in enumerate(chunks, start=first_position)
+    )
+    f.write(dump_lines(payloads))
+
+
+def _write_manifest(manifest_path: Path, payload: Dict[str, object]) -> None:
+    with manifest_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
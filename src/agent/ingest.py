@@ -3,15 +3,27 @@
 from __future__ import annotations
 
 import hashlib
-import json
-from dataclasses import asdict, dataclass
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
 import importlib
+import importlib.util
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from .jsonl import write_jsonl
 
 
 SUPPORTED_SUFFIXES = {".txt", ".md", ".pdf"}
+INGEST_WORKERS_ENV = "AGENT_INGEST_WORKERS"
+DISCOVERY_WORKERS = 16
+TEXT_IO_WORKERS = 32
+# Decoded PDF texts kept in the parent process, keyed by (resolved path, mtime).
+PDF_TEXT_CACHE_SIZE = 64
+
+_PDF_TEXTS: Dict[Tuple[str, int], str] = {}
 
 
 @dataclass
@@ -25,57 +37,164 @@ class IngestedDocument:
     created_at: str
     risk_level: str = "unknown"
 
+    def to_dict(self) -> dict:
+        """Serialize the document to a JSON-friendly dict."""
+        return {
+            "doc_id": self.doc_id,
+            "title": self.title,
+            "source_path": self.source_path,
+            "text": self.text,
+            "created_at": self.created_at,
+            "risk_level": self.risk_level,
+        }
+
 
 def discover_documents(base_path: Path) -> List[Path]:
-    """Return a list of supported documents under the base path."""
-    if not base_path.exists():
+    """Return a list of supported documents under the base path.
+
+    Hidden directories are skipped. Top-level subdirectories are scanned
+    concurrently, which hides per-directory latency on network-mounted
+    knowledge bases.
+    """
+    if not base_path.is_dir():
         return []
-    return [p for p in base_path.rglob("*") if p.is_file() and p.suffix.lower() in SUPPORTED_SUFFIXES]
+    documents: List[Path] = []
+    subdirs: List[str] = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            # Directory symlinks are not followed, matching os.walk below; a link to
+            # an ancestor would otherwise pull in files outside the knowledge base.
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    subdirs.append(entry.path)
+            elif entry.is_file() and _is_supported(entry.name):
+                documents.append(Path(entry.path))
+    if subdirs:
+        with ThreadPoolExecutor(max_workers=min(DISCOVERY_WORKERS, len(subdirs))) as pool:
+            for found in pool.map(_scan_directory, subdirs):
+                documents.extend(found)
+    return documents
 
 
 def load_documents(paths: Iterable[Path]) -> List[str]:
     """Load documents as strings (text, markdown, and readable PDFs)."""
-    documents = []
-    for path in paths:
-        if path.suffix.lower() == ".pdf":
-            text = _extract_pdf_text(path)
-            if text:
-                documents.append(text)
-            continue
-        with path.open("r", encoding="utf-8") as f:
-            documents.append(f.read())
-    return documents
+    paths = list(paths)
+    texts = _read_texts(paths)
+    # PDFs without extractable text come back empty and are dropped.
+    return [text for path, text in zip(paths, texts) if text or path.suffix.lower() != ".pdf"]
 
 
 def ingest_knowledge_base(raw_dir: Path, output_path: Path) -> List[IngestedDocument]:
     """Transform raw KB files into a normalized JSONL file."""
 
-    documents = []
-    for path in discover_documents(raw_dir):
-        text = _load_text(path)
-        if not text:
-            continue
-        record = _build_document_record(path, raw_dir, text)
-        documents.append(record)
+    paths = discover_documents(raw_dir)
+    documents: List[IngestedDocument] = []
+    for path, text in zip(paths, _read_texts(paths)):
+        text = text.strip()
+        if text:
+            documents.append(_build_document_record(path, raw_dir, text))
 
+    # Writing stays in the parent process so JSONL lines never interleave.
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as f:
-        for doc in documents:
-            f.write(json.dumps(asdict(doc), ensure_ascii=False) + "\n")
+    write_jsonl(output_path, (doc.to_dict() for doc in documents))
+
+    return documents
+
 
+def _scan_directory(directory: str) -> List[Path]:
+    # Filenames are filtered as plain strings; only supported names are stat'ed, which
+    # drops broken symlinks and FIFOs, and Path objects are only built for matches.
+    documents: List[Path] = []
+    for root, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+        for name in filenames:
+            if _is_supported(name):
+                full_path = os.path.join(root, name)
+                if os.path.isfile(full_path):
+                    documents.append(Path(full_path))
     return documents
 
 
-def _load_text(path: Path) -> str | None:
-    suffix = path.suffix.lower()
-    if suffix in {".txt", ".md"}:
-        with path.open("r", encoding="utf-8") as f:
-            text = f.read()
-        return text.strip() or None
-    if suffix == ".pdf":
-        text = _extract_pdf_text(path)
-        return text.strip() or None
-    return None
+def _is_supported(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in SUPPORTED_SUFFIXES
+
+
+def _read_texts(paths: Sequence[Path]) -> List[str]:
+    """Return the raw text of each path, in order, fanning out when it pays off.
+
+    PDF decoding is CPU-bound and runs in worker processes; plain text and
+    Markdown reads are I/O-bound and run on a thread pool alongside them.
+    Decoded PDF text is memoized here in the parent by (path, mtime), so only
+    PDFs that are new or changed are sent to the workers.
+    """
+    texts: List[str] = [""] * len(paths)
+    text_positions: List[int] = []
+    pending: List[Tuple[int, Tuple[str, int] | None]] = []
+    for i, path in enumerate(paths):
+        if path.suffix.lower() != ".pdf":
+            text_positions.append(i)
+            continue
+        key = _pdf_cache_key(path)
+        cached = _PDF_TEXTS.pop(key, None) if key is not None else None
+        if cached is None:
+            pending.append((i, key))
+        else:
+            _PDF_TEXTS[key] = cached
+            texts[i] = cached
+    pending_paths = [paths[i] for i, _ in pending]
+
+    workers = min(_ingest_workers(), len(pending_paths))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # With the fork start method the pool launches every worker on its first
+        # submit, so submitting here keeps forks ahead of the reader threads below;
+        # forking a multi-threaded process can deadlock.
+        pdf_results = pool.map(_extract_pdf_text, pending_paths, chunksize=4) if pool is not None else None
+        text_workers = min(TEXT_IO_WORKERS, len(text_positions))
+        with ThreadPoolExecutor(max_workers=max(1, text_workers)) as threads:
+            text_results = threads.map(_read_text_file, [paths[i] for i in text_positions])
+            if pdf_results is None:
+                pdf_results = [_extract_pdf_text(path) for path in pending_paths]
+            for (i, key), text in zip(pending, pdf_results):
+                texts[i] = text
+                if key is not None:
+                    _remember_pdf_text(key, text)
+            for i, text in zip(text_positions, text_results):
+                texts[i] = text
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return texts
+
+
+def _read_text_file(path: Path) -> str:
+    with path.open("r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _pdf_cache_key(path: Path) -> Tuple[str, int] | None:
+    try:
+        return str(path.resolve()), path.stat().st_mtime_ns
+    except OSError:
+        # Left uncached; decoding reports why the file could not be read.
+        return None
+
+
+def _remember_pdf_text(key: Tuple[str, int], text: str) -> None:
+    if len(_PDF_TEXTS) >= PDF_TEXT_CACHE_SIZE:
+        del _PDF_TEXTS[next(iter(_PDF_TEXTS))]
+    _PDF_TEXTS[key] = text
+
+
+def _ingest_workers() -> int:
+    """Return the ingestion worker count, overridable via AGENT_INGEST_WORKERS."""
+    configured = os.getenv(INGEST_WORKERS_ENV)
+    if configured:
+        try:
+            return max(1, int(configured))
+        except ValueError as exc:
+            raise ValueError(f"{INGEST_WORKERS_ENV} must be an integer, got {configured!r}") from exc
+    return max(1, (os.cpu_count() or 1) - 1)
 
 
 def _extract_pdf_text(path: Path) -> str:
@@ -87,7 +206,7 @@ def _extract_pdf_text(path: Path) -> str:
         return ""
 
     texts: List[str] = []
-    for page_index, page in enumerate(reader.pages):
+    for page in reader.pages:
         try:
             page_text = page.extract_text() or ""
         except Exception:  # pragma: no cover - defensive logging path
@@ -102,8 +221,12 @@ def _extract_pdf_text(path: Path) -> str:
     return "\n".join(texts)
 
 
+@lru_cache(maxsize=1)
 def _get_pdf_reader():
-    """Return the PdfReader class, raising a clear error if unavailable."""
+    """Return the PdfReader class, raising a clear error if unavailable.
+
+    Resolved once per process; a missing dependency is not cached and raises each time.
+    """
     spec = importlib.util.find_spec("pypdf")
     if spec is None:
         raise RuntimeError(
@@ -116,7 +239,8 @@ def _get_pdf_reader():
 
 def _build_document_record(path: Path, base_path: Path, text: str) -> IngestedDocument:
     relative_path = path.relative_to(base_path) if path.is_absolute() or base_path in path.parents else path
-    doc_id = hashlib.sha1(str(relative_path).encode("utf-8")).hexdigest()
+    # doc_id only needs to be stable, not cryptographic; 20 bytes gives 40 hex chars.
+    doc_id = hashlib.blake2b(str(relative_path).encode("utf-8"), digest_size=20).hexdigest()
     created_at = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc).isoformat()
     title = path.stem.replace("_", " ").strip() or str(relative_path)
     return IngestedDocument(
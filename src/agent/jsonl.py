@@ -0,0 +1,63 @@
+"""JSON Lines helpers that use the optional ``orjson`` parser when installed."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List
+
+try:  # orjson parses several times faster than the stdlib json module.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+loads: Callable[[bytes | str], Any] = orjson.loads if orjson is not None else json.loads
+
+# Records serialized into one buffer per write call.
+_WRITE_BLOCK_RECORDS = 1024
+
+
+def dumps(record: Any) -> bytes:
+    """Serialize a record to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+def dump_lines(records: Iterable[Any]) -> bytes:
+    """Serialize records as newline-terminated JSON lines in a single buffer."""
+    return b"".join(dumps(record) + b"\n" for record in records)
+
+
+def write_jsonl(path: Path, records: Iterable[Any]) -> None:
+    """Write records to ``path`` as JSON lines, one write call per block of records."""
+    iterator = iter(records)
+    with path.open("wb") as f:
+        while block := list(islice(iterator, _WRITE_BLOCK_RECORDS)):
+            f.write(dump_lines(block))
+
+
+def read_jsonl(path: Path) -> List[Any]:
+    """Parse every valid JSON line in ``path``, skipping blank or malformed lines."""
+    records: List[Any] = []
+    for line in path.read_bytes().splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def iter_jsonl(path: Path) -> Iterator[Any]:
+    """Lazily parse JSON lines from ``path``, skipping blank or malformed lines."""
+    with path.open("rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,164 @@
+"""Semantic cache that reuses retrieval results for near-duplicate queries."""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import faiss  # type: ignore
+import numpy as np
+
+from .jsonl import read_jsonl, write_jsonl
+from .retrieve import RetrievedChunk
+
+
+QUERY_CACHE_FILENAME = "query_cache.jsonl"
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300.0
+# Nearest cached queries checked per lookup; the closest one may have retrieved too few chunks.
+_LOOKUP_NEIGHBORS = 8
+
+
+@dataclass
+class CachedQuery:
+    """A cached query embedding with the chunks it retrieved."""
+
+    embedding: np.ndarray
+    top_k: int
+    chunks: List[dict]
+    created_at: float
+
+
+class QueryCache:
+    """Query-embedding cache persisted next to the FAISS index.
+
+    A lookup hits when a cached query has cosine similarity of at least
+    ``threshold`` with the new one and retrieved at least as many chunks as
+    requested. Entries expire after ``ttl_seconds``, the oldest entries are
+    evicted past ``max_entries``, and the whole cache is dropped when the index
+    file changes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        index_stamp: int,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ) -> None:
+        self.path = path
+        self.index_stamp = index_stamp
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: List[CachedQuery] = []
+        self._search_index: faiss.Index | None = None
+
+    @classmethod
+    def load(cls, index_dir: Path, **kwargs) -> "QueryCache":
+        """Load the cache for an index directory, discarding stale or expired entries."""
+        index_path = index_dir / "index.faiss"
+        index_stamp = index_path.stat().st_mtime_ns if index_path.exists() else 0
+        cache = cls(index_dir / QUERY_CACHE_FILENAME, index_stamp, **kwargs)
+        if not cache.path.exists():
+            return cache
+        for payload in read_jsonl(cache.path):
+            if payload.get("index_stamp") != index_stamp:
+                continue
+            cache._entries.append(
+                CachedQuery(
+                    embedding=np.asarray(payload["embedding"], dtype="float32"),
+                    top_k=int(payload["top_k"]),
+                    chunks=list(payload["chunks"]),
+                    created_at=float(payload["created_at"]),
+                )
+            )
+        cache._expire(time.time())
+        return cache
+
+    def get(self, embedding: np.ndarray, top_k: int) -> List[RetrievedChunk] | None:
+        """Return cached chunks for a near-duplicate query, or None on a miss."""
+        self._expire(time.time())
+        for entry in self._similar_entries(embedding):
+            if entry.top_k >= top_k:
+                return [RetrievedChunk(**chunk) for chunk in entry.chunks[:top_k]]
+        return None
+
+    def put(self, embedding: np.ndarray, top_k: int, chunks: List[RetrievedChunk]) -> None:
+        """Record retrieved chunks for a query embedding, evicting the oldest entry if full.
+
+        Near-duplicate entries that retrieved no more chunks are replaced rather
+        than kept alongside the new one.
+        """
+        superseded = {id(entry) for entry in self._similar_entries(embedding) if entry.top_k <= top_k}
+        if superseded:
+            self._entries = [entry for entry in self._entries if id(entry) not in superseded]
+        self._entries.append(
+            CachedQuery(
+                embedding=_as_matrix(embedding)[0].copy(),
+                top_k=top_k,
+                chunks=[chunk.to_dict() for chunk in chunks],
+                created_at=time.time(),
+            )
+        )
+        # Entries stay in creation order, so the oldest is always first.
+        while len(self._entries) > self.max_entries:
+            del self._entries[0]
+        self._search_index = None
+
+    def save(self) -> None:
+        """Persist live entries to disk.
+
+        The file is written under a temporary name and renamed into place, so a
+        concurrent reader never sees a truncated cache.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        write_jsonl(
+            tmp_path,
+            (
+                {
+                    "index_stamp": self.index_stamp,
+                    "embedding": entry.embedding.tolist(),
+                    "top_k": entry.top_k,
+                    "chunks": entry.chunks,
+                    "created_at": entry.created_at,
+                }
+                for entry in self._entries
+            ),
+        )
+        tmp_path.replace(self.path)
+
+    def _similar_entries(self, embedding: np.ndarray) -> List[CachedQuery]:
+        """Return cached entries at or above the similarity threshold, closest first."""
+        if not self._entries:
+            return []
+        k = min(_LOOKUP_NEIGHBORS, len(self._entries))
+        scores, neighbors = self._index().search(_as_matrix(embedding), k)
+        return [
+            self._entries[int(position)]
+            for score, position in zip(scores[0], neighbors[0])
+            if position != -1 and float(score) >= self.threshold
+        ]
+
+    def _expire(self, now: float) -> None:
+        live = [entry for entry in self._entries if now - entry.created_at <= self.ttl_seconds]
+        if len(live) != len(self._entries):
+            self._entries = live
+            self._search_index = None
+
+    def _index(self) -> faiss.Index:
+        if self._search_index is None:
+            matrix = np.stack([entry.embedding for entry in self._entries])
+            self._search_index = faiss.IndexFlatIP(matrix.shape[1])
+            self._search_index.add(matrix)
+        return self._search_index
+
+
+def _as_matrix(embedding: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(np.asarray(embedding, dtype="float32").reshape(1, -1))
@@ -2,15 +2,30 @@
 
 from __future__ import annotations
 
-import json
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Sequence
+from typing import Dict, List, Sequence, Tuple
 
 import faiss  # type: ignore
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
-from .index import DEFAULT_BATCH_SIZE, DEFAULT_MODEL
+from .index import DEFAULT_BATCH_SIZE, DEFAULT_MODEL, MANIFEST_FILENAME, load_manifest
+from .jsonl import read_jsonl
+from .server import embed_remote
+
+# Flat indexes this small are scanned with one NumPy matmul instead of FAISS search.
+EXACT_SEARCH_MAX_VECTORS = 2048
+# Map index files rather than copying them into RAM. IO_FLAG_MMAP maps IVF inverted
+# lists; IO_FLAG_MMAP_IFC (newer faiss only) maps flat and scalar-quantized codes.
+# The two cannot be combined for IVF indexes.
+_IVF_READ_FLAGS = faiss.IO_FLAG_MMAP
+_CODES_READ_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+# Indexes this large are copied to the first GPU when faiss was built with GPU support.
+GPU_MIN_VECTORS = 200_000
+# Index directories kept open at once; each holds at most one version of its index.
+OPEN_INDEX_CACHE_SIZE = 4
 
 
 @dataclass
@@ -28,59 +43,167 @@ class RetrievedChunk:
 
     def to_dict(self) -> dict:
         """Serialize the chunk to a JSON-friendly dict."""
-        return asdict(self)
+        return {
+            "chunk_id": self.chunk_id,
+            "doc_id": self.doc_id,
+            "source_path": self.source_path,
+            "text": self.text,
+            "title": self.title,
+            "start": self.start,
+            "end": self.end,
+            "score": self.score,
+        }
+
+
+@dataclass
+class _MetadataColumns:
+    """Chunk metadata stored column-wise, indexed by FAISS row id.
+
+    Fields are normalized once at load time, so building results only indexes
+    into a few flat lists instead of looking up keys in one dict per chunk.
+    """
+
+    chunk_id: List[str]
+    doc_id: List[str]
+    source_path: List[str]
+    text: List[str]
+    title: List[str]
+    start: np.ndarray
+    end: np.ndarray
+
+
+@dataclass
+class _LoadedIndex:
+    """FAISS index plus the sidecar data retrieval needs, loaded once per build."""
+
+    index: faiss.Index
+    metadata: _MetadataColumns
+    manifest: dict
+    exact_vectors: np.ndarray | None
+    # Must outlive a GPU-resident index, so it is kept alongside it.
+    gpu_resources: object | None = None
+
 
+# Resolved index directory -> (index, meta and manifest mtimes it was loaded at, loaded index).
+_OPEN_INDEXES: Dict[str, Tuple[Tuple[int, int, int], _LoadedIndex]] = {}
 
-def retrieve_chunks(index_dir: Path, query: str, top_k: int = 3) -> List[RetrievedChunk]:
-    """Embed a query and return the top matching chunks with metadata."""
+
+def retrieve_chunks(
+    index_dir: Path,
+    query: str,
+    top_k: int = 3,
+    query_embedding: np.ndarray | None = None,
+) -> List[RetrievedChunk]:
+    """Embed a query and return the top matching chunks with metadata.
+
+    Pass ``query_embedding`` (from :func:`embed_query`) to skip re-encoding a
+    query that has already been embedded.
+    """
+    return retrieve_chunks_batch(index_dir, [query], top_k=top_k, query_embeddings=query_embedding)[0]
+
+
+def retrieve_chunks_batch(
+    index_dir: Path,
+    queries: Sequence[str],
+    top_k: int = 3,
+    query_embeddings: np.ndarray | None = None,
+) -> List[List[RetrievedChunk]]:
+    """Embed several queries at once and return the top matching chunks for each.
+
+    All queries go through a single encode call and a single index search, which
+    lets FAISS parallelize across queries instead of scanning once per query.
+    """
+    empty: List[List[RetrievedChunk]] = [[] for _ in queries]
     index_path = index_dir / "index.faiss"
     meta_path = index_dir / "meta.jsonl"
-    if top_k <= 0 or not index_path.exists() or not meta_path.exists():
-        return []
+    if not queries or top_k <= 0 or not index_path.exists() or not meta_path.exists():
+        return empty
 
-    metadata = _load_metadata(meta_path)
-    if not metadata:
-        return []
+    manifest_path = index_dir / MANIFEST_FILENAME
+    loaded = _open_index(
+        str(index_dir.resolve()),
+        (
+            index_path.stat().st_mtime_ns,
+            meta_path.stat().st_mtime_ns,
+            # Older indexes have no manifest; their settings come from meta.jsonl.
+            manifest_path.stat().st_mtime_ns if manifest_path.exists() else 0,
+        ),
+    )
+    metadata = loaded.metadata
+    if not len(metadata.chunk_id):
+        return empty
 
-    index = faiss.read_index(str(index_path))
+    index = loaded.index
     if index.ntotal == 0:
-        return []
+        return empty
 
-    model_name = metadata[0].get("model_name", DEFAULT_MODEL)
-    query_embedding = _embed_query(model_name, [query])
+    manifest = loaded.manifest
+    if query_embeddings is None:
+        model_name = manifest.get("model_name", DEFAULT_MODEL)
+        query_embeddings = _embed_query(model_name, queries)
     limit = min(top_k, index.ntotal)
-    distances, neighbors = index.search(query_embedding, limit)
+    if loaded.exact_vectors is not None:
+        distances, neighbors = _exact_topk(query_embeddings, loaded.exact_vectors, limit)
+    else:
+        ef_search = manifest.get("ef_search")
+        if ef_search:
+            # efSearch bounds the HNSW candidate list, so it must cover the requested k.
+            faiss.ParameterSpace().set_index_parameter(index, "efSearch", max(int(ef_search), limit))
+        distances, neighbors = index.search(query_embeddings, limit)
+
+    return [_collect_chunks(metadata, row_scores, row_ids) for row_scores, row_ids in zip(distances, neighbors)]
+
+
+def retrieve_snippets(index_dir: Path, query: str, limit: int = 3) -> List[str]:
+    """Embed a query and return the top matching chunks as decorated strings."""
+    chunks = retrieve_chunks(index_dir=index_dir, query=query, top_k=limit)
+    return [_format_snippet(chunk) for chunk in chunks]
+
+
+def embed_query(index_dir: Path, query: str) -> np.ndarray | None:
+    """Embed a query with the index's model, or return None if no index exists."""
+    if not (index_dir / "index.faiss").exists() or not (index_dir / "meta.jsonl").exists():
+        return None
+    model_name = load_manifest(index_dir).get("model_name", DEFAULT_MODEL)
+    return _embed_query(model_name, [query])
+
 
+def _collect_chunks(metadata: _MetadataColumns, scores: np.ndarray, ids: np.ndarray) -> List[RetrievedChunk]:
     results: List[RetrievedChunk] = []
-    for score, idx in zip(distances[0], neighbors[0]):
-        if idx == -1 or idx >= len(metadata):
+    row_count = len(metadata.chunk_id)
+    for score, idx in zip(scores, ids):
+        if idx == -1 or idx >= row_count:
             continue
-        entry = metadata[idx]
         results.append(
             RetrievedChunk(
-                chunk_id=str(entry.get("chunk_id") or ""),
-                doc_id=str(entry.get("doc_id") or ""),
-                source_path=str(entry.get("source_path") or ""),
-                text=str(entry.get("text") or ""),
-                title=str(entry.get("title") or "Untitled"),
-                start=int(entry.get("start") or 0),
-                end=int(entry.get("end") or 0),
+                chunk_id=metadata.chunk_id[idx],
+                doc_id=metadata.doc_id[idx],
+                source_path=metadata.source_path[idx],
+                text=metadata.text[idx],
+                title=metadata.title[idx],
+                start=int(metadata.start[idx]),
+                end=int(metadata.end[idx]),
                 score=float(score),
             )
         )
-        if len(results) >= top_k:
-            break
     return results
 
 
-def retrieve_snippets(index_dir: Path, query: str, limit: int = 3) -> List[str]:
-    """Embed a query and return the top matching chunks as decorated strings."""
-    chunks = retrieve_chunks(index_dir=index_dir, query=query, top_k=limit)
-    return [_format_snippet(chunk) for chunk in chunks]
+def _exact_topk(queries: np.ndarray, embeddings: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the exact top-k inner-product scores and row ids, best first, per query."""
+    scores = np.asarray(queries, dtype="float32") @ embeddings.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
 
 
 def _embed_query(model_name: str, queries: Sequence[str]):
-    model = SentenceTransformer(model_name or DEFAULT_MODEL)
+    # A running `agent-cli serve` already holds the model, skipping the cold load.
+    remote = embed_remote(queries, model_name or DEFAULT_MODEL)
+    if remote is not None:
+        return remote
+    model = _get_model(model_name or DEFAULT_MODEL)
     return model.encode(
         queries,
         batch_size=DEFAULT_BATCH_SIZE,
@@ -90,15 +213,76 @@ def _embed_query(model_name: str, queries: Sequence[str]):
     )
 
 
-def _load_metadata(meta_path: Path) -> List[dict]:
-    records: List[dict] = []
-    with meta_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                records.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
-    return records
+def _open_index(index_dir: str, stamp: Tuple[int, int, int]) -> _LoadedIndex:
+    """Return the loaded index for a directory, reloading it when the file mtimes change.
+
+    ``stamp`` holds the mtimes of the index, metadata and manifest files.
+    Entries are keyed by directory alone, so a rebuild replaces the previous
+    version (and releases its mmaps and GPU copy) instead of sitting beside it.
+    """
+    cached = _OPEN_INDEXES.pop(index_dir, None)
+    if cached is None or cached[0] != stamp:
+        # The superseded version was popped above, so it is released before the reload.
+        cached = None
+        if len(_OPEN_INDEXES) >= OPEN_INDEX_CACHE_SIZE:
+            del _OPEN_INDEXES[next(iter(_OPEN_INDEXES))]
+        cached = (stamp, _load_index(Path(index_dir)))
+    # Re-inserting keeps the dict in least- to most-recently used order.
+    _OPEN_INDEXES[index_dir] = cached
+    return cached[1]
+
+
+def _load_index(directory: Path) -> _LoadedIndex:
+    manifest = load_manifest(directory)
+    read_flags = _IVF_READ_FLAGS if manifest.get("index_type") == "ivfpq" else _CODES_READ_FLAGS
+    index = faiss.read_index(str(directory / "index.faiss"), read_flags)
+    exact_vectors = None
+    if manifest.get("index_type") == "flat" and 0 < index.ntotal <= EXACT_SEARCH_MAX_VECTORS:
+        exact_vectors = index.reconstruct_n(0, index.ntotal)
+    nprobe = manifest.get("nprobe")
+    if nprobe:
+        # Set before any GPU copy, which inherits nprobe from the CPU index.
+        faiss.extract_index_ivf(index).nprobe = int(nprobe)
+    index, gpu_resources = _maybe_to_gpu(index)
+    return _LoadedIndex(
+        index=index,
+        metadata=_load_metadata(directory / "meta.jsonl"),
+        manifest=manifest,
+        exact_vectors=exact_vectors,
+        gpu_resources=gpu_resources,
+    )
+
+
+def _maybe_to_gpu(index: faiss.Index) -> Tuple[faiss.Index, object | None]:
+    """Move a large index to GPU 0 when available; the CPU index is kept otherwise."""
+    get_num_gpus = getattr(faiss, "get_num_gpus", None)
+    if get_num_gpus is None or index.ntotal < GPU_MIN_VECTORS or get_num_gpus() == 0:
+        return index, None
+    try:
+        resources = faiss.StandardGpuResources()
+        return faiss.index_cpu_to_gpu(resources, 0, index), resources
+    except (AttributeError, RuntimeError):
+        # Graph indexes such as HNSW have no GPU implementation.
+        return index, None
+
+
+@lru_cache(maxsize=4)
+def _get_model(model_name: str) -> SentenceTransformer:
+    """Load a SentenceTransformer once per process and reuse it for later queries."""
+    return SentenceTransformer(model_name)
+
+
+def _load_metadata(meta_path: Path) -> _MetadataColumns:
+    rows = read_jsonl(meta_path)
+    return _MetadataColumns(
+        chunk_id=[str(row.get("chunk_id") or "") for row in rows],
+        doc_id=[str(row.get("doc_id") or "") for row in rows],
+        source_path=[str(row.get("source_path") or "") for row in rows],
+        text=[str(row.get("text") or "") for row in rows],
+        title=[str(row.get("title") or "Untitled") for row in rows],
+        start=np.fromiter((int(row.get("start") or 0) for row in rows), dtype=np.int64, count=len(rows)),
+        end=np.fromiter((int(row.get("end") or 0) for row in rows), dtype=np.int64, count=len(rows)),
+    )
 
 
 def _format_snippet(chunk: RetrievedChunk) -> str:
@@ -2,8 +2,15 @@
 
 from __future__ import annotations
 
+import re
+from functools import lru_cache
 from typing import List
 
+# Every boundary str.splitlines() recognizes, normalized to "\n" before splitting.
+_LINE_BREAK_PATTERN = re.compile("\r\n|[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+# A paragraph is a run of consecutive lines that each contain non-whitespace.
+_PARAGRAPH_PATTERN = re.compile(r"^[^\S\n]*\S[^\n]*(?:\n[^\S\n]*\S[^\n]*)*", re.MULTILINE)
+
 
 def apply_seo_rules(content: str, keyword: str | None = None) -> str:
     """Apply structural SEO rules and keyword placement.
@@ -24,18 +31,28 @@ def _ensure_heading_structure(content: str) -> str:
     if not lines:
         lines = ["# Article"]
 
-    first_nonempty = next((idx for idx, line in enumerate(lines) if line.strip()), None)
+    # One pass records the first non-empty line and which heading levels exist.
+    first_nonempty: int | None = None
+    has_h2 = has_h3 = False
+    for idx, line in enumerate(lines):
+        if first_nonempty is None and line.strip():
+            first_nonempty = idx
+        if line.startswith("## "):
+            has_h2 = True
+        elif line.startswith("### "):
+            has_h3 = True
+
     if first_nonempty is None:
         lines = ["# Article"]
     elif not lines[first_nonempty].startswith("# "):
         title = lines[first_nonempty].lstrip("# ").strip() or "Article"
         lines.insert(0, f"# {title}")
 
-    if not any(line.startswith("## ") for line in lines):
+    if not has_h2:
         lines.append("")
         lines.append("## Key Insights")
 
-    if not any(line.startswith("### ") for line in lines):
+    if not has_h3:
         lines.append("")
         lines.append("### Details")
 
@@ -64,22 +81,17 @@ def _ensure_keyword_placement(content: str, keyword: str) -> str:
 
 
 def _split_paragraphs(content: str) -> List[str]:
-    paragraphs: List[str] = []
-    current: List[str] = []
-    for line in content.splitlines():
-        if line.strip():
-            current.append(line)
-        else:
-            if current:
-                paragraphs.append("\n".join(current))
-                current = []
-    if current:
-        paragraphs.append("\n".join(current))
-    return paragraphs
+    return _PARAGRAPH_PATTERN.findall(_LINE_BREAK_PATTERN.sub("\n", content))
 
 
 def _inject_keyword(paragraph: str, keyword: str) -> str:
-    if keyword.lower() in paragraph.lower():
+    if _keyword_pattern(keyword).search(paragraph):
         return paragraph
     suffix = "" if paragraph.endswith((".", "!", "?")) else "."
     return f"{paragraph}{suffix} {keyword}"
+
+
+@lru_cache(maxsize=32)
+def _keyword_pattern(keyword: str) -> re.Pattern[str]:
+    """Compile a case-insensitive literal match so paragraphs need not be lowercased."""
+    return re.compile(re.escape(keyword), re.IGNORECASE)
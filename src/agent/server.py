@@ -0,0 +1,166 @@
+"""Resident embedding server that keeps SentenceTransformer models loaded between CLI calls."""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from .index import DEFAULT_BATCH_SIZE, DEFAULT_MODEL
+
+
+SOCKET_PATH_ENV = "AGENT_EMBED_SOCKET"
+# A loaded model answers a query batch well within this; a server busy loading
+# another model is skipped in favour of encoding locally.
+CLIENT_HEADER_TIMEOUT_SECONDS = 5.0
+CLIENT_TIMEOUT_SECONDS = 60.0
+
+_models: Dict[str, SentenceTransformer] = {}
+_models_lock = threading.Lock()
+
+
+def default_socket_path() -> Path:
+    """Return the socket path, preferring AGENT_EMBED_SOCKET then $XDG_RUNTIME_DIR."""
+    configured = os.getenv(SOCKET_PATH_ENV)
+    if configured:
+        return Path(configured)
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "agent.sock"
+    # /tmp is shared between users, so keep sockets apart per user.
+    suffix = f"-{os.getuid()}" if hasattr(os, "getuid") else ""
+    return Path(tempfile.gettempdir()) / f"agent{suffix}.sock"
+
+
+def serve(socket_path: Path | None = None, model_name: str = DEFAULT_MODEL) -> None:
+    """Serve embedding requests on a Unix socket until interrupted."""
+    path = socket_path or default_socket_path()
+    _remove_stale_socket(path)
+    _get_model(model_name)
+    # Bind under a tight umask so the socket is owner-only (0600) from the moment it
+    # exists; chmod after binding would leave a window on a shared /tmp.
+    previous_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(str(path), _EmbedHandler)
+    finally:
+        os.umask(previous_umask)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
+
+
+def embed_remote(
+    texts: Sequence[str],
+    model_name: str,
+    socket_path: Path | None = None,
+) -> np.ndarray | None:
+    """Embed texts through a running server, or return None when none is reachable."""
+    path = socket_path or default_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not _is_own_socket(path):
+        return None
+    request = json.dumps({"model": model_name, "texts": list(texts)}, ensure_ascii=False)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CLIENT_HEADER_TIMEOUT_SECONDS)
+            sock.connect(str(path))
+            with sock.makefile("rwb") as stream:
+                stream.write(request.encode("utf-8") + b"\n")
+                stream.flush()
+                header = json.loads(stream.readline())
+                if "error" in header:
+                    return None
+                sock.settimeout(CLIENT_TIMEOUT_SECONDS)
+                rows, dimension = header["shape"]
+                payload = stream.read(rows * dimension * 4)
+    except (OSError, ValueError):
+        return None
+    if len(payload) != rows * dimension * 4:
+        return None
+    return np.frombuffer(payload, dtype="float32").reshape(rows, dimension)
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Unlink a socket left behind by a dead server, refusing to touch anything else."""
+    try:
+        mode = path.lstat().st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} exists and is not a socket; refusing to replace it.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+            return
+    raise RuntimeError(f"An embedding server is already listening on {path}.")
+
+
+def _is_own_socket(path: Path) -> bool:
+    # The /tmp fallback is world-writable, so a socket created by another user
+    # could answer with arbitrary embeddings.
+    try:
+        info = path.stat()
+    except OSError:
+        return False
+    if not stat.S_ISSOCK(info.st_mode):
+        return False
+    return not hasattr(os, "getuid") or info.st_uid == os.getuid()
+
+
+class _EmbedHandler(socketserver.StreamRequestHandler):
+    """Handle one request: a JSON line in, a JSON header line plus float32 bytes out."""
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line.strip():
+            # A liveness probe from another `serve`, or a client that gave up.
+            return
+        try:
+            request = json.loads(line)
+            vectors = _encode(request.get("model") or DEFAULT_MODEL, request["texts"])
+        except Exception as exc:  # pragma: no cover - reported back to the client
+            self.wfile.write(json.dumps({"error": str(exc)}).encode("utf-8") + b"\n")
+            return
+        try:
+            self.wfile.write(json.dumps({"shape": list(vectors.shape)}).encode("utf-8") + b"\n")
+            self.wfile.write(vectors.tobytes())
+        except (BrokenPipeError, ConnectionResetError):
+            # The client timed out waiting (e.g. on a model load) and encoded locally.
+            pass
+
+
+def _encode(model_name: str, texts: List[str]) -> np.ndarray:
+    vectors = _get_model(model_name).encode(
+        texts,
+        batch_size=DEFAULT_BATCH_SIZE,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+        normalize_embeddings=True,
+    )
+    return np.ascontiguousarray(vectors, dtype="float32")
+
+
+def _get_model(model_name: str) -> SentenceTransformer:
+    with _models_lock:
+        model = _models.get(model_name)
+    if model is None:
+        # Load outside the lock so requests for already-loaded models keep being
+        # served; if two threads race, the first stored model wins.
+        loaded = SentenceTransformer(model_name)
+        with _models_lock:
+            model = _models.setdefault(model_name, loaded)
+    return model
@@ -7,24 +7,29 @@ from typing import List
 
 
 _CITATION_PATTERN = re.compile(r"\[[^\[\]]+—[^\[\]]+\]")
-_UNSUPPORTED_PREDICTION_PATTERN = re.compile(r"\bwill\s+(?:double|triple|skyrocket|explode|guarantee)\b", re.IGNORECASE)
+# "predict" also covers "prediction"; both alternatives are matched in one scan.
+_PREDICTION_PATTERN = re.compile(
+    r"predict|\bwill\s+(?:double|triple|skyrocket|explode|guarantee)\b",
+    re.IGNORECASE,
+)
 _PROHIBITED_PHRASES = (
     "guaranteed profit",
     "guaranteed return",
     "risk-free",
 )
+_PROHIBITED_PATTERN = re.compile("|".join(re.escape(phrase) for phrase in _PROHIBITED_PHRASES), re.IGNORECASE)
 
 
 def check_compliance(text: str) -> List[str]:
     """Return validation failures that should block publishing."""
     failures: List[str] = []
-    lower_text = text.lower()
 
+    found = {match.group(0).lower() for match in _PROHIBITED_PATTERN.finditer(text)}
     for phrase in _PROHIBITED_PHRASES:
-        if phrase in lower_text:
+        if phrase in found:
             failures.append(f"Prohibited promise detected: {phrase}.")
 
-    if "predict" in lower_text or "prediction" in lower_text or _UNSUPPORTED_PREDICTION_PATTERN.search(text):
+    if _PREDICTION_PATTERN.search(text):
         failures.append("Unsupported predictions are not allowed.")
 
     if not _CITATION_PATTERN.search(text):
@@ -0,0 +1,78 @@
+"""Shared fixtures: a deterministic stand-in for SentenceTransformer and a tiny KB."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+import pytest
+
+DIMENSION = 32
+
+
+class FakeSentenceTransformer:
+    """Bag-of-words hashing encoder; texts sharing words get similar unit vectors."""
+
+    encoded: List[str] = []
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        FakeSentenceTransformer.encoded.extend(texts)
+        vectors = np.zeros((len(texts), DIMENSION), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.md5(f"{self.model_name}:{word}".encode("utf-8")).digest()
+                vectors[row, digest[0] % DIMENSION] += 1.0
+            norm = np.linalg.norm(vectors[row])
+            if norm:
+                vectors[row] /= norm
+            else:
+                vectors[row, 0] = 1.0
+        return vectors
+
+
+@pytest.fixture
+def fake_model(monkeypatch, tmp_path):
+    """Route every model load to FakeSentenceTransformer and bypass any running server."""
+    from agent import index as index_module
+    from agent import retrieve as retrieve_module
+    from agent import server as server_module
+
+    FakeSentenceTransformer.encoded = []
+    monkeypatch.setattr(index_module, "SentenceTransformer", FakeSentenceTransformer)
+    monkeypatch.setattr(retrieve_module, "SentenceTransformer", FakeSentenceTransformer)
+    monkeypatch.setattr(server_module, "SentenceTransformer", FakeSentenceTransformer)
+    monkeypatch.setattr(server_module, "_models", {})
+    monkeypatch.setenv(server_module.SOCKET_PATH_ENV, str(tmp_path / "no-server.sock"))
+    retrieve_module._get_model.cache_clear()
+    retrieve_module._OPEN_INDEXES.clear()
+    yield FakeSentenceTransformer
+    retrieve_module._get_model.cache_clear()
+    retrieve_module._OPEN_INDEXES.clear()
+
+
+def write_kb(path: Path, documents: dict) -> Path:
+    """Write ``{doc_id: text}`` as a processed kb.jsonl."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for doc_id, text in documents.items():
+            record = {"doc_id": doc_id, "title": doc_id.title(), "source_path": f"{doc_id}.md", "text": text}
+            f.write(json.dumps(record) + "\n")
+    return path
+
+
+@pytest.fixture
+def kb_path(tmp_path):
+    return write_kb(
+        tmp_path / "kb.jsonl",
+        {
+            "bonds": "Treasury bonds pay fixed coupons until maturity.",
+            "stocks": "Equity shares give ownership and variable dividends.",
+            "cash": "Money market funds hold short term cash instruments.",
+        },
+    )
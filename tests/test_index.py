@@ -0,0 +1,125 @@
+"""Round-trip tests for building, retrieving from and rebuilding an index."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+from agent import retrieve as retrieve_module  # noqa: E402
+from agent.index import (  # noqa: E402
+    DEFAULT_MODEL,
+    EMBEDDING_CACHE_FILENAME,
+    EMBEDDINGS_FILENAME,
+    MANIFEST_FILENAME,
+    build_index,
+    index_is_stale,
+    load_manifest,
+    refresh_index,
+)
+from agent.retrieve import retrieve_chunks  # noqa: E402
+
+from conftest import DIMENSION, write_kb  # noqa: E402
+
+
+def _bump_mtime(path, seconds=1):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_build_then_retrieve_round_trip(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir, model_name="fake/model")
+
+    manifest = load_manifest(index_dir)
+    assert manifest["model_name"] == "fake/model"
+    assert manifest["kb_path"] == str(kb_path.resolve())
+    assert manifest["kb_mtime_ns"] == kb_path.stat().st_mtime_ns
+    assert manifest["index_type"] == "flat"
+    assert not (index_dir / (MANIFEST_FILENAME + ".tmp")).exists()
+
+    meta_rows = (index_dir / "meta.jsonl").read_text(encoding="utf-8").splitlines()
+    embeddings = np.fromfile(index_dir / EMBEDDINGS_FILENAME, dtype="float16")
+    assert embeddings.shape == (len(meta_rows) * DIMENSION,)
+
+    chunks = retrieve_chunks(index_dir, "treasury bonds coupons", top_k=2)
+    assert chunks[0].doc_id == "bonds"
+    assert chunks[0].score >= chunks[1].score
+
+
+def test_rebuild_reuses_cached_embeddings(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir)
+    assert fake_model.encoded
+    assert (index_dir / EMBEDDING_CACHE_FILENAME).exists()
+
+    fake_model.encoded = []
+    build_index(kb_path, index_dir)
+    assert fake_model.encoded == []
+
+
+def test_stale_index_is_rebuilt_with_its_own_settings(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir, model_name="fake/custom", chunk_size=500, chunk_overlap=0, batch_size=4)
+    assert retrieve_chunks(index_dir, "treasury bonds", top_k=1)[0].doc_id == "bonds"
+    assert not index_is_stale(kb_path, index_dir)
+    assert refresh_index(kb_path, index_dir) is None
+
+    write_kb(kb_path, {"gold": "Gold bullion is a traditional inflation hedge."})
+    _bump_mtime(kb_path)
+    assert index_is_stale(kb_path, index_dir)
+    assert refresh_index(kb_path, index_dir) == index_dir / "index.faiss"
+
+    manifest = load_manifest(index_dir)
+    assert manifest["model_name"] == "fake/custom"
+    assert (manifest["chunk_size"], manifest["chunk_overlap"], manifest["batch_size"]) == (500, 0, 4)
+    assert manifest["kb_mtime_ns"] == kb_path.stat().st_mtime_ns
+    # The cached open index must be replaced, not served from before the rebuild.
+    assert [chunk.doc_id for chunk in retrieve_chunks(index_dir, "gold bullion", top_k=3)] == ["gold"]
+
+
+def test_index_from_another_kb_is_never_stale(fake_model, kb_path, tmp_path):
+    other_kb = write_kb(tmp_path / "custom.jsonl", {"custom": "Custom corpus text."})
+    index_dir = tmp_path / "index"
+    build_index(other_kb, index_dir, model_name="fake/custom")
+    _bump_mtime(kb_path)
+
+    assert not index_is_stale(kb_path, index_dir)
+    assert refresh_index(kb_path, index_dir) is None
+    assert load_manifest(index_dir)["kb_path"] == str(other_kb.resolve())
+
+
+def test_missing_index_is_built_with_defaults(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    assert index_is_stale(kb_path, index_dir)
+    refresh_index(kb_path, index_dir)
+    assert load_manifest(index_dir)["model_name"] == DEFAULT_MODEL
+
+
+def test_unreadable_manifest_falls_back_to_metadata(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir)
+    (index_dir / MANIFEST_FILENAME).write_text('{"model_na', encoding="utf-8")
+
+    assert load_manifest(index_dir)["chunk_id"].startswith("bonds")
+
+
+def test_manifest_change_reloads_open_index(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir)
+    retrieve_chunks(index_dir, "bonds", top_k=1)
+
+    manifest_path = index_dir / MANIFEST_FILENAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["ef_search"] = 7
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    _bump_mtime(manifest_path)
+    retrieve_chunks(index_dir, "bonds", top_k=1)
+
+    (_, loaded), = retrieve_module._OPEN_INDEXES.values()
+    assert loaded.manifest["ef_search"] == 7
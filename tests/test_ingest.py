@@ -0,0 +1,102 @@
+"""Tests for document discovery, ingestion output and the parent-side PDF text cache."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import pytest
+
+from agent import ingest
+from agent.ingest import discover_documents, ingest_knowledge_base, load_documents
+
+
+class _FakePage:
+    def __init__(self, text):
+        self.text = text
+
+    def extract_text(self):
+        return self.text
+
+
+class _FakePdfReader:
+    """Treats a file's contents as pages separated by '|' and records each decode."""
+
+    decoded = []
+
+    def __init__(self, path):
+        _FakePdfReader.decoded.append(path)
+        with open(path, encoding="utf-8") as f:
+            self.pages = [_FakePage(text) for text in f.read().split("|")]
+
+
+@pytest.fixture
+def fake_pdf_reader(monkeypatch):
+    _FakePdfReader.decoded = []
+    monkeypatch.setattr(ingest, "_get_pdf_reader", lambda: _FakePdfReader)
+    monkeypatch.setattr(ingest, "_PDF_TEXTS", {})
+    # The fake reader lives in this process, so keep PDF decoding in-process.
+    monkeypatch.setenv(ingest.INGEST_WORKERS_ENV, "1")
+    return _FakePdfReader
+
+
+def test_discovery_skips_hidden_dirs_broken_links_and_dir_symlinks(tmp_path):
+    outside = tmp_path / "outside.md"
+    outside.write_text("outside", encoding="utf-8")
+    raw = tmp_path / "raw"
+    for relative in ["top.MD", "notes.json", "sub/deep/a.txt", ".git/HEAD.md", "sub/.cache/b.txt"]:
+        path = raw / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("text", encoding="utf-8")
+    os.symlink(raw / "missing.md", raw / "sub" / "dangling.md")
+    os.symlink(tmp_path, raw / "up")
+
+    found = sorted(str(path.relative_to(raw)) for path in discover_documents(raw))
+    assert found == ["sub/deep/a.txt", "top.MD"]
+
+
+def test_ingest_writes_one_record_per_document(tmp_path):
+    raw = tmp_path / "raw"
+    (raw / "guides").mkdir(parents=True)
+    (raw / "guides" / "bond_basics.md").write_text("  Bonds pay coupons.  ", encoding="utf-8")
+    (raw / "empty.txt").write_text("   ", encoding="utf-8")
+    output = tmp_path / "kb.jsonl"
+
+    documents = ingest_knowledge_base(raw, output)
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert records == [doc.to_dict() for doc in documents]
+    assert len(records) == 1
+    assert records[0]["text"] == "Bonds pay coupons."
+    assert records[0]["title"] == "bond basics"
+    assert len(records[0]["doc_id"]) == 40
+
+
+def test_pdf_text_is_decoded_once_per_version(fake_pdf_reader, tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    report = raw / "report.pdf"
+    report.write_text("page one| |page two", encoding="utf-8")
+    (raw / "notes.md").write_text("notes", encoding="utf-8")
+    paths = discover_documents(raw)
+
+    assert sorted(load_documents(paths)) == ["notes", "page one\npage two"]
+    documents = ingest_knowledge_base(raw, tmp_path / "kb.jsonl")
+    assert sorted(doc.text for doc in documents) == ["notes", "page one\npage two"]
+    assert len(fake_pdf_reader.decoded) == 1
+
+    report.write_text("revised", encoding="utf-8")
+    stat = report.stat()
+    os.utime(report, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert "revised" in load_documents(paths)
+    assert len(fake_pdf_reader.decoded) == 2
+
+
+def test_pdf_without_text_is_skipped(fake_pdf_reader, tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "scan.pdf").write_text(" | ", encoding="utf-8")
+
+    assert load_documents(discover_documents(raw)) == []
+    assert ingest_knowledge_base(raw, tmp_path / "kb.jsonl") == []
+    assert len(fake_pdf_reader.decoded) == 1
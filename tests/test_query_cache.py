@@ -0,0 +1,89 @@
+"""Round-trip tests for the persisted semantic query cache."""
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+
+from agent import cli  # noqa: E402
+from agent.index import build_index  # noqa: E402
+from agent.query_cache import QUERY_CACHE_FILENAME, QueryCache  # noqa: E402
+from agent.retrieve import RetrievedChunk, embed_query  # noqa: E402
+
+
+def _chunks(count):
+    return [RetrievedChunk(f"c{i}", "d", "d.md", f"text {i}", "D", 0, 6, 1.0 - i / 10) for i in range(count)]
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    cache = QueryCache.load(tmp_path)
+    cache.put(_unit(1, 0, 0), 2, _chunks(2))
+    cache.save()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    reloaded = QueryCache.load(tmp_path)
+    assert reloaded.get(_unit(1, 0.01, 0), 2) == _chunks(2)
+    assert reloaded.get(_unit(0, 1, 0), 1) is None
+
+
+def test_index_rebuild_discards_entries(tmp_path):
+    index_path = tmp_path / "index.faiss"
+    index_path.write_bytes(b"v1")
+    cache = QueryCache.load(tmp_path)
+    cache.put(_unit(1, 0, 0), 1, _chunks(1))
+    cache.save()
+
+    stat = index_path.stat()
+    os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert QueryCache.load(tmp_path).get(_unit(1, 0, 0), 1) is None
+
+
+def test_lookup_checks_neighbours_for_enough_chunks(tmp_path):
+    cache = QueryCache.load(tmp_path)
+    cache.put(_unit(1, 0.02, 0), 5, _chunks(5))
+    cache.put(_unit(1, 0, 0.01), 2, _chunks(2))
+
+    # The closest entry only retrieved 2 chunks; the next one can serve 4.
+    assert len(cache.get(_unit(1, 0, 0.01), 4)) == 4
+
+
+def test_put_replaces_near_duplicates_with_fewer_chunks(tmp_path):
+    cache = QueryCache.load(tmp_path)
+    cache.put(_unit(1, 0, 0), 2, _chunks(2))
+    cache.put(_unit(1, 0.01, 0), 5, _chunks(5))
+
+    assert len(cache._entries) == 1
+    assert len(cache.get(_unit(1, 0, 0), 5)) == 5
+
+
+def test_oldest_entries_are_evicted_first(tmp_path):
+    cache = QueryCache.load(tmp_path, max_entries=2)
+    for axis in range(3):
+        cache.put(np.eye(3, dtype="float32")[axis], 1, _chunks(1))
+
+    assert cache.get(np.eye(3, dtype="float32")[0], 1) is None
+    assert cache.get(np.eye(3, dtype="float32")[2], 1) is not None
+
+
+def test_cli_hit_does_not_rewrite_cache(fake_model, kb_path, tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(kb_path, index_dir)
+
+    first = cli._cached_retrieve(index_dir, "treasury bonds", top_k=2)
+    cache_path = index_dir / QUERY_CACHE_FILENAME
+    written_at = cache_path.stat().st_mtime_ns
+    second = cli._cached_retrieve(index_dir, "treasury bonds", top_k=2)
+
+    assert second == first
+    assert cache_path.stat().st_mtime_ns == written_at
+    assert QueryCache.load(index_dir).get(embed_query(index_dir, "treasury bonds"), 2) == first
@@ -0,0 +1,71 @@
+"""Round-trip tests for the Unix-socket embedding server protocol."""
+
+from __future__ import annotations
+
+import socket
+import stat
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+if not hasattr(socket, "AF_UNIX"):
+    pytest.skip("Unix sockets are not available", allow_module_level=True)
+
+from agent import server  # noqa: E402
+
+
+def _start_server(socket_path):
+    thread = threading.Thread(target=server.serve, kwargs={"socket_path": socket_path, "model_name": "fake/model"})
+    thread.daemon = True
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not socket_path.exists():
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    return thread
+
+
+def test_embed_round_trip(fake_model, tmp_path):
+    socket_path = tmp_path / "agent.sock"
+    _start_server(socket_path)
+
+    assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+    vectors = server.embed_remote(["treasury bonds", "cash"], "fake/model", socket_path=socket_path)
+    expected = fake_model("fake/model").encode(["treasury bonds", "cash"])
+    assert vectors.dtype == np.float32
+    np.testing.assert_array_equal(vectors, expected)
+
+
+def test_serve_refuses_to_replace_a_regular_file(fake_model, tmp_path):
+    not_a_socket = tmp_path / "README.md"
+    not_a_socket.write_text("keep me", encoding="utf-8")
+
+    with pytest.raises(FileExistsError):
+        server.serve(socket_path=not_a_socket, model_name="fake/model")
+    assert not_a_socket.read_text(encoding="utf-8") == "keep me"
+    assert server.embed_remote(["x"], "fake/model", socket_path=not_a_socket) is None
+
+
+def test_serve_refuses_to_take_over_a_live_server(fake_model, tmp_path):
+    socket_path = tmp_path / "agent.sock"
+    _start_server(socket_path)
+
+    with pytest.raises(RuntimeError):
+        server.serve(socket_path=socket_path, model_name="fake/model")
+    assert server.embed_remote(["x"], "fake/model", socket_path=socket_path) is not None
+
+
+def test_serve_replaces_a_dead_socket(fake_model, tmp_path):
+    socket_path = tmp_path / "agent.sock"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as leftover:
+        leftover.bind(str(socket_path))
+
+    _start_server(socket_path)
+    deadline = time.monotonic() + 5
+    while server.embed_remote(["x"], "fake/model", socket_path=socket_path) is None:
+        assert time.monotonic() < deadline, "server did not replace the dead socket"
+        time.sleep(0.01)